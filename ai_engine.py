@@ -1,20 +1,257 @@
 from deep_translator import GoogleTranslator
 from gtts import gTTS
+from text_processor import tokenize
+import hashlib
+import io
+import orjson
 import os
+import re
+import time
 import requests
-import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 
 
 
+# Language codes for translation and speech
+TELUGU = "te"
+ENGLISH = "en"
+
 # Configuration for Hugging Face API
 API_URL = "https://router.huggingface.co/hf-inference/models/google/flan-t5-large"
 
+# Read the token once; without it every request would just come back 401.
+_HF_TOKEN = os.environ.get("HF_TOKEN")
+if not _HF_TOKEN:
+    print("HF_TOKEN is not set; AI service calls are disabled.")
+
 HEADERS = {
-    "Authorization": f"Bearer {os.getenv('HF_TOKEN')}",
+    "Authorization": f"Bearer {_HF_TOKEN}",
     "Content-Type": "application/json"
 }
 
+# Shared session so LLM calls reuse pooled keep-alive connections, retrying
+# rate limits and transient server errors with exponential backoff.
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"]
+    )
+))
+
+# Shared pool for overlapping the network-bound translation and speech calls,
+# with a semaphore capping how many outbound requests run at once.
+_POOL = ThreadPoolExecutor(max_workers=4)
+_NET_LIMIT = threading.Semaphore(3)
+
+# On-disk caches for translations and speech, keyed by a hash of language and text.
+_TR_CACHE_DIR = "tr_cache"
+_TTS_CACHE_DIR = "tts_cache"
+_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+_SWEEP_INTERVAL = 60 * 60  # seconds between expiry sweeps of a cache directory
+_last_sweep = {}
+
+# Translations are split into sentence-like segments so repeated segments are
+# translated once. A segment ends at a line break or at ".", "!" or "?"
+# followed by whitespace, so decimals like "9.81" stay whole. Uncached
+# segments are sent newline-joined, up to the translator's character limit
+# per request.
+_SEGMENT_RE = re.compile(r"[^\s•](?:[^.!?\n]|[.!?](?=\S))*[.!?]*")
+_TR_MAX_CHARS = 5000
+_TR_MEMO = {}
+_TR_MEMO_SIZE = 512
+_TR_MEMO_LOCK = threading.Lock()  # Sessions and _POOL workers share the memo
+
+def _cache_path(directory, lang, text, ext):
+    key = hashlib.sha1(f"{lang}|{text}".encode("utf-8")).hexdigest()
+    return os.path.join(directory, key + ext)
+
+def _is_cached(path):
+    try:
+        return time.time() - os.path.getmtime(path) < _CACHE_TTL
+    except OSError:
+        return False
+
+def _write_cache(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    _sweep_expired(os.path.dirname(path))
+
+def _sweep_expired(directory):
+    """
+    Deletes cache files older than the TTL, at most once per sweep interval.
+
+    Args:
+        directory (str): The cache directory to sweep.
+    """
+    now = time.time()
+    if now - _last_sweep.get(directory, 0) < _SWEEP_INTERVAL:
+        return
+    _last_sweep[directory] = now
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and now - entry.stat().st_mtime >= _CACHE_TTL:
+                    os.remove(entry.path)
+            except OSError:
+                pass  # Removed concurrently or not accessible
+
+def _synthesize(text, lang):
+    """
+    Generates speech for the text, reusing a cached mp3 when one exists.
+
+    Args:
+        text (str): The text to convert to speech.
+        lang (str): The gTTS language code.
+
+    Returns:
+        bytes: The MP3 audio.
+    """
+    path = _cache_path(_TTS_CACHE_DIR, lang, text, ".mp3")
+    if _is_cached(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    buf = io.BytesIO()
+    tts = gTTS(text=text, lang=lang)
+    with _NET_LIMIT:
+        tts.write_to_fp(buf)
+    audio = buf.getvalue()
+    _write_cache(path, audio)
+    return audio
+
+def _remember_translation(key, translated):
+    with _TR_MEMO_LOCK:
+        if key not in _TR_MEMO and len(_TR_MEMO) >= _TR_MEMO_SIZE:
+            _TR_MEMO.pop(next(iter(_TR_MEMO)))
+        _TR_MEMO[key] = translated
+
+def _cached_translation(segment, target):
+    key = (target, segment)
+    with _TR_MEMO_LOCK:
+        translated = _TR_MEMO.get(key)
+    if translated is not None:
+        return translated
+
+    path = _cache_path(_TR_CACHE_DIR, target, segment, ".txt")
+    if _is_cached(path):
+        with open(path, "r", encoding="utf-8") as f:
+            translated = f.read()
+        _remember_translation(key, translated)
+        return translated
+    return None
+
+def _pack_segments(segments):
+    """
+    Groups segments into requests whose newline-joined text is shorter than
+    _TR_MAX_CHARS, the translator's exclusive limit. A segment at or over the
+    limit is sent on its own, and its request fails.
+    """
+    requests_ = []
+    current, size = [], 0
+    for segment in segments:
+        if current and size + 1 + len(segment) >= _TR_MAX_CHARS:
+            requests_.append(current)
+            current, size = [], 0
+        size += len(segment) + (1 if current else 0)
+        current.append(segment)
+    if current:
+        requests_.append(current)
+    return requests_
+
+def _translate_request(translator, segments):
+    """
+    Translates the segments in one request by joining them with newlines,
+    falling back to one request per segment if the lines don't come back
+    one-to-one.
+
+    Args:
+        translator (GoogleTranslator): The translator to use.
+        segments (list): Segments without line breaks.
+
+    Returns:
+        list: The translations, in the same order as the segments, with None
+        for any segment that could not be translated.
+    """
+    try:
+        with _NET_LIMIT:
+            result = translator.translate("\n".join(segments))
+    except Exception as e:
+        print(f"Translation error: {e}")
+        return [None] * len(segments)
+    lines = result.split("\n") if result else []
+    if len(lines) == len(segments):
+        return [line.strip() or None for line in lines]
+
+    # GoogleTranslator.translate returns None for text it echoes back
+    # unchanged (e.g. no letters or digits), which also counts as a miss.
+    translated = []
+    for segment in segments:
+        try:
+            with _NET_LIMIT:
+                translated.append(translator.translate(segment))
+        except Exception as e:
+            print(f"Translation error: {e}")
+            translated.append(None)
+    return translated
+
+def _translate(text, target):
+    """
+    Translates the text segment by segment, only sending uncached segments.
+
+    Args:
+        text (str): The text to translate.
+        target (str): The target language code.
+
+    Returns:
+        str: The translated text, with the original spacing between segments.
+    """
+    matches = list(_SEGMENT_RE.finditer(text))
+    segments = [m.group().rstrip() for m in matches]
+
+    translations = {}
+    misses = []
+    for segment in dict.fromkeys(segments):
+        translated = _cached_translation(segment, target)
+        if translated is None:
+            misses.append(segment)
+        else:
+            translations[segment] = translated
+
+    translator = GoogleTranslator(source='auto', target=target)
+    for request in _pack_segments(misses):
+        for segment, translated in zip(request, _translate_request(translator, request)):
+            if translated is None:
+                translations[segment] = segment  # Keep the source text; don't cache it
+                continue
+            translations[segment] = translated
+            _remember_translation((target, segment), translated)
+            _write_cache(_cache_path(_TR_CACHE_DIR, target, segment, ".txt"), translated.encode("utf-8"))
+
+    # Reassemble, keeping whatever separated the segments in the original.
+    parts = []
+    end = 0
+    for m, segment in zip(matches, segments):
+        parts.append(text[end:m.start()])
+        parts.append(translations[segment])
+        end = m.start() + len(segment)
+    parts.append(text[end:])
+    return "".join(parts)
+
 def to_telugu(text):
     """
     Translates the given text to Telugu.
@@ -26,60 +263,128 @@ def to_telugu(text):
         str: The translated text in Telugu.
     """
     try:
-        return GoogleTranslator(source='auto', target='te').translate(text)
+        return _translate(text, TELUGU)
     except Exception as e:
         print(f"Translation error: {e}")
         return text  # Return original text if translation fails
 
 def speak_telugu(text):
     """
-    Generates an audio file for the given Telugu text using gTTS.
+    Generates audio for the given Telugu text using gTTS.
 
     Args:
         text (str): The text to convert to speech.
 
     Returns:
-        str: The filename of the generated audio file.
+        bytes: The MP3 audio, or None if generation failed.
     """
-    filename = "telugu_audio.mp3"
     try:
-        tts = gTTS(text=text, lang='te')
-        tts.save(filename)
-        return filename
+        return _synthesize(text, TELUGU)
     except Exception as e:
         print(f"Audio generation error: {e}")
         return None
 
-def ask_llm(prompt):
+def _parse_generation(item):
+    """
+    Extracts the generated text from a single item of an LLM response.
+
+    Args:
+        item: One entry of the response list (a dict, or a one-element list of dicts).
+
+    Returns:
+        str: The generated text or an error message.
+    """
+    if isinstance(item, list) and len(item) > 0:
+        item = item[0]
+    if isinstance(item, dict) and "generated_text" in item:
+        return item["generated_text"]
+    return "Unexpected AI response format."
+
+def ask_llm(prompt_or_prompts):
     """
-    Queries the Hugging Face LLM with the given prompt.
+    Queries the Hugging Face LLM with one prompt or a batch of prompts.
+
+    A list of prompts is sent as a single request, so several generations
+    cost one round trip instead of one each.
 
     Args:
-        prompt (str): The prompt to send to the LLM.
+        prompt_or_prompts (str or list): The prompt, or list of prompts, to send to the LLM.
 
     Returns:
-        str: The response from the LLM or an error message.
+        str or list: The response from the LLM (or an error message) for a single
+        prompt, or a list of responses in the same order as the prompts.
     """
-    payload = {"inputs": prompt}
+    batched = isinstance(prompt_or_prompts, list)
+    if batched and not prompt_or_prompts:
+        return []
+
+    payload = {"inputs": prompt_or_prompts, "options": {"use_cache": True}}
+
+    def _fail(message):
+        return [message] * len(prompt_or_prompts) if batched else message
+
+    if not _HF_TOKEN:
+        return _fail("AI service is not configured: set the HF_TOKEN environment variable.")
+
     try:
-        response = requests.post(API_URL, headers=HEADERS, json=payload, timeout=60)
+        response = _SESSION.post(API_URL, json=payload, timeout=60)
         response.raise_for_status()  # Raise an exception for bad status codes
 
         try:
-            result = response.json()
-        except ValueError:
-            return "AI service did not return valid JSON data. Try again."
+            result = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            return _fail("AI service did not return valid JSON data. Try again.")
 
         if isinstance(result, dict) and "error" in result:
-            return f"API Error: {result['error']}"
+            return _fail(f"API Error: {result['error']}")
 
-        if isinstance(result, list) and len(result) > 0 and "generated_text" in result[0]:
-            return result[0]["generated_text"]
+        if not isinstance(result, list) or len(result) == 0:
+            return _fail("Unexpected AI response format.")
 
-        return "Unexpected AI response format."
+        if not batched:
+            return _parse_generation(result[0])
+
+        if len(result) != len(prompt_or_prompts):
+            return _fail("Unexpected AI response format.")
+        return [_parse_generation(item) for item in result]
 
     except requests.exceptions.RequestException as e:
-        return f"Connection issue with AI service: {e}"
+        return _fail(f"Connection issue with AI service: {e}")
+
+def _translate_and_speak(text):
+    """
+    Translates the text to Telugu and generates audio for the translation.
+
+    Args:
+        text (str): The English text.
+
+    Returns:
+        tuple: (Telugu text, MP3 audio bytes)
+    """
+    telugu = to_telugu(text)
+    return telugu, speak_telugu(telugu)
+
+# Heading-like lines (all caps) are treated as topics; long lines and
+# sentences (stripped runs of over 40 characters between periods) as content.
+_TOPIC_RE = re.compile(r"^[ \t]*([A-Z][A-Z0-9 \-]{5,}?)[ \t]*$", re.MULTILINE)
+_LONG_LINE_RE = re.compile(r"^.{41,}$", re.MULTILINE)
+_SENTENCE_RE = re.compile(r"[^.\s][^.]{39,}[^.\s]")
+
+def _first_matches(pattern, text, limit, group=0):
+    return [m.group(group) for m in islice(pattern.finditer(text), limit)]
+
+def _build_summary(chunks):
+    text = chunks[0]
+    topics = _first_matches(_TOPIC_RE, text, 6, group=1)
+
+    if not topics:
+        important = _first_matches(_LONG_LINE_RE, text, 5)
+        return "This document contains key formulas and concepts related to: " + ", ".join(important)
+    return "This document covers important topics in Electromagnetics such as: " + ", ".join(topics)
+
+def _build_key_points(chunks):
+    points = _first_matches(_SENTENCE_RE, chunks[0], 5)
+    return "\n• " + "\n• ".join(points)
 
 def summarize_doc(chunks):
     """
@@ -89,28 +394,13 @@ def summarize_doc(chunks):
         chunks (list): List of text chunks from the document.
 
     Returns:
-        tuple: (English summary, Telugu summary, audio file path)
+        tuple: (English summary, Telugu summary, MP3 audio bytes)
     """
     if not chunks:
         return "No content to summarize.", "", None
 
-    text = chunks[0]
-    lines = text.split("\n")
-    topics = []
-
-    for line in lines:
-        line = line.strip()
-        if len(line) > 5 and line.isupper():
-            topics.append(line)
-
-    if not topics:
-        important = [line for line in lines if len(line) > 40]
-        summary = "This document contains key formulas and concepts related to: " + ", ".join(important[:5])
-    else:
-        summary = "This document covers important topics in Electromagnetics such as: " + ", ".join(topics[:6])
-
-    telugu_summary = to_telugu(summary)
-    audio_file = speak_telugu(telugu_summary)
+    summary = _build_summary(chunks)
+    telugu_summary, audio_file = _translate_and_speak(summary)
 
     return summary, telugu_summary, audio_file
 
@@ -122,65 +412,130 @@ def extract_key_points(chunks):
         chunks (list): List of text chunks from the document.
 
     Returns:
-        tuple: (English key points, Telugu key points, audio file path)
+        tuple: (English key points, Telugu key points, MP3 audio bytes)
     """
     if not chunks:
         return "No content to extract key points from.", "", None
 
-    text = chunks[0]
-    lines = text.split(".")
-    points = [line.strip() for line in lines if len(line.strip()) > 40]
-    key_points = "\n• " + "\n• ".join(points[:5])
-
-    telugu = to_telugu(key_points)
-    audio_file = speak_telugu(telugu)
+    key_points = _build_key_points(chunks)
+    telugu, audio_file = _translate_and_speak(key_points)
 
     return key_points, telugu, audio_file
 
-def find_best_chunk(question, chunks):
+def prefetch_key_points(chunks):
+    """
+    Starts extract_key_points on the shared thread pool, so its translation
+    and speech requests overlap with other work such as the summary.
+
+    Args:
+        chunks (list): List of text chunks from the document.
+
+    Returns:
+        Future: Resolves to the return value of extract_key_points.
+    """
+    return _POOL.submit(extract_key_points, chunks)
+
+def _best_chunk_id(question, chunks, index=None):
+    if not chunks:
+        return None
+    question_lower = question.lower()
+
+    if index is None:
+        for i, chunk in enumerate(chunks):
+            if question_lower in chunk.lower():
+                return i
+        return 0
+
+    postings = [index["tokens"].get(token, set()) for token in set(tokenize(question))]
+    chunks_lower = index["chunks_lower"]
+    if any(not posting for posting in postings):
+        # Some token is not a whole word anywhere (e.g. "magnet" inside
+        # "electromagnetic"), so match the question as a substring instead.
+        for i, chunk_lower in enumerate(chunks_lower):
+            if question_lower in chunk_lower:
+                return i
+    elif postings:
+        # Start from the rarest token so the work is bounded by its postings,
+        # and stop as soon as no chunk has every token.
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= posting
+
+        for i in sorted(candidates):
+            if question_lower in chunks_lower[i]:
+                return i
+
+    if index["vectorizer"] is not None:
+        scores = index["tfidf"] @ index["vectorizer"].transform([question]).T
+        scores = scores.toarray().ravel()
+        if scores.max() > 0:
+            return int(scores.argmax())
+    return 0
+
+def find_best_chunk(question, chunks, index=None):
     """
     Finds the best matching chunk for the given question.
 
     Args:
         question (str): The question to match.
         chunks (list): List of text chunks.
+        index (dict, optional): Lookup structure from build_chunk_index. When
+            given, an exact phrase match among the chunks containing every
+            question token wins; otherwise the chunk with the highest TF-IDF
+            similarity to the question is used.
 
     Returns:
         str: The best matching chunk or the first chunk if no match.
     """
-    for chunk in chunks:
-        if question.lower() in chunk.lower():
-            return chunk
-    return chunks[0] if chunks else ""
+    i = _best_chunk_id(question, chunks, index)
+    return chunks[i] if i is not None else ""
 
-def answer_question(question, chunks):
+def answer_question(question, chunks, index=None):
     """
     Answers a question based on the document chunks.
 
     Args:
         question (str): The question to answer.
         chunks (list): List of text chunks.
+        index (dict, optional): Lookup structure from build_chunk_index. When
+            given, the answering sentence is looked up by the question's first
+            word instead of scanning the chunk.
 
     Returns:
         str: The answer or a default message.
     """
-    context = find_best_chunk(question, chunks)
-    sentences = context.split(".")
-    for s in sentences:
-        if question.lower().split()[0] in s.lower():
-            return s.strip()
+    i = _best_chunk_id(question, chunks, index)
+    context = chunks[i] if i is not None else ""
+    first_word = question.lower().split()[0]
+
+    if index is not None and i is not None:
+        j = index["sentence_lookup"][i].get(first_word)
+        if j is not None:
+            return index["sentences"][i][j]
+
+    context_lower = context.lower()
+
+    if len(context_lower) != len(context):
+        # Lowercasing shifted the offsets, so scan the sentences instead.
+        for s in context.split("."):
+            if first_word in s.lower():
+                return s.strip()
+        return "The document discusses this topic, but no exact sentence match was found."
+
+    # Locate the first sentence containing the word directly instead of
+    # splitting and lowercasing every sentence.
+    pos = context_lower.find(first_word)
+    if pos != -1 and "." not in first_word:
+        start = context.rfind(".", 0, pos) + 1
+        end = context.find(".", pos)
+        return context[start:end if end != -1 else len(context)].strip()
     return "The document discusses this topic, but no exact sentence match was found."
 
-
-
-
-
-from gtts import gTTS
-
 def speak_english(text):
-    filename = "english_audio.mp3"
-    tts = gTTS(text=text, lang='en')
-    tts.save(filename)
-    return filename
+    return _synthesize(text, ENGLISH)
+
 def speak_telugu_voice(text):
     return speak_telugu(text)
@@ -1,8 +1,8 @@
 import streamlit as st
-import os
+import hashlib
 from document_loader import load_document
-from text_processor import clean_text, split_into_chunks
-from ai_engine import summarize_doc, extract_key_points, answer_question, speak_telugu_voice, to_telugu
+from text_processor import clean_text, split_into_chunks, build_chunk_index
+from ai_engine import summarize_doc, extract_key_points, prefetch_key_points, answer_question, speak_telugu_voice, to_telugu
 
 
 # Set page configuration
@@ -13,6 +13,39 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# ---------- CACHED PIPELINE ----------
+# Streamlit reruns this script on every interaction; caching on the file
+# contents lets reruns and re-uploads skip the whole ingest pipeline.
+# Entries are bounded so old documents don't stay in memory indefinitely.
+CACHE_MAX_ENTRIES = 4
+CACHE_TTL = 60 * 60  # seconds
+
+def _digest(uploaded_file):
+    sha1 = hashlib.sha1()
+    uploaded_file.seek(0)
+    for block in iter(lambda: uploaded_file.read(1 << 20), b""):
+        sha1.update(block)
+    return sha1.hexdigest()
+
+# The leading underscore keeps Streamlit from hashing the file object itself;
+# the content digest is the cache key.
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def _load(digest, name, _uploaded_file):
+    _uploaded_file.seek(0)
+    return load_document(_uploaded_file, name)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def _clean(text):
+    return clean_text(text)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def _split(text):
+    return split_into_chunks(text)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def _index(chunks):
+    return build_chunk_index(chunks)
+
 # ---------- SESSION STATE INITIALIZATION ----------
 if "upload_history" not in st.session_state:
     st.session_state.upload_history = []
@@ -23,6 +56,24 @@ if "chat_history" not in st.session_state:
 if "processed_chunks" not in st.session_state:
     st.session_state.processed_chunks = None
 
+if "chunk_index" not in st.session_state:
+    st.session_state.chunk_index = None
+
+if "num_chunks" not in st.session_state:
+    st.session_state.num_chunks = None
+
+if "total_words" not in st.session_state:
+    st.session_state.total_words = None
+
+if "full_text" not in st.session_state:
+    st.session_state.full_text = None
+
+if "preview" not in st.session_state:
+    st.session_state.preview = None
+
+if "key_points_future" not in st.session_state:
+    st.session_state.key_points_future = None
+
 if "document_name" not in st.session_state:
     st.session_state.document_name = None
 
@@ -73,15 +124,6 @@ if uploaded_file is not None:
         if uploaded_file.name not in st.session_state.upload_history:
             st.session_state.upload_history.append(uploaded_file.name)
 
-        # Save the uploaded file temporarily
-        file_path = os.path.join(os.getcwd(), uploaded_file.name)
-        try:
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-        except Exception as e:
-            st.error(f"Error saving file: {e}")
-            st.stop()
-
         # -------- PROGRESS BAR --------
         progress = st.progress(0)
         status = st.empty()
@@ -89,29 +131,43 @@ if uploaded_file is not None:
         try:
             status.text("Reading document...")
             progress.progress(20)
-            raw_text = load_document(file_path)
+            raw_text = _load(_digest(uploaded_file), uploaded_file.name, uploaded_file)
 
             status.text("Cleaning text...")
             progress.progress(50)
-            clean = clean_text(raw_text)
+            clean = _clean(raw_text)
 
             status.text("Splitting into chunks...")
             progress.progress(80)
-            chunks = split_into_chunks(clean)
+            chunks = _split(clean)
+            chunk_index = _index(chunks)
+
+            # Derived values for the preview and statistics panels, computed
+            # once here rather than on every rerun.
+            total_words = sum(len(chunk.split()) for chunk in chunks)
+            preview = " ".join(chunks[0].split()[:100]) + "..." if chunks else "No content."
 
+            # Only publish the document once every step has succeeded, so the
+            # session never pairs new chunks with an old index or stats.
             st.session_state.processed_chunks = chunks
+            st.session_state.chunk_index = chunk_index
+            st.session_state.key_points_future = None
+            st.session_state.num_chunks = len(chunks)
+            st.session_state.total_words = total_words
+            st.session_state.full_text = clean  # the chunks joined back with spaces
+            st.session_state.preview = preview
 
             progress.progress(100)
             status.text("Document ready!")
             st.success("Document processed successfully!")
 
         except Exception as e:
+            # Drop the previous document so it isn't shown under the new name.
+            st.session_state.processed_chunks = None
+            st.session_state.chunk_index = None
+            st.session_state.key_points_future = None
             st.error(f"Error processing document: {e}")
             st.stop()
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(file_path):
-                os.remove(file_path)
 
     # -------- LAYOUT COLUMNS --------
     col1, col2 = st.columns([2, 1])
@@ -120,20 +176,17 @@ if uploaded_file is not None:
         st.subheader("📄 Document Content Preview")
         if st.session_state.processed_chunks:
             # Show a preview of the first chunk or a summary
-            preview = " ".join(st.session_state.processed_chunks[0].split()[:100]) + "..." if st.session_state.processed_chunks else "No content."
-            st.write(preview)
+            st.write(st.session_state.preview)
             with st.expander("View Full Document"):
-                st.write(" ".join(st.session_state.processed_chunks))
+                st.write(st.session_state.full_text)
         else:
             st.write("No document processed yet.")
 
     with col2:
         st.subheader("📊 Document Statistics")
         if st.session_state.processed_chunks:
-            num_chunks = len(st.session_state.processed_chunks)
-            total_words = sum(len(chunk.split()) for chunk in st.session_state.processed_chunks)
-            st.write(f"**Number of Chunks:** {num_chunks}")
-            st.write(f"**Total Words:** {total_words}")
+            st.write(f"**Number of Chunks:** {st.session_state.num_chunks}")
+            st.write(f"**Total Words:** {st.session_state.total_words}")
         else:
             st.write("No statistics available.")
 
@@ -143,6 +196,11 @@ if uploaded_file is not None:
     st.subheader("📌 Document Summary")
     if st.button("Generate Summary", key="summary_btn"):
         if st.session_state.processed_chunks:
+            # Start the key points in the background so their network
+            # requests overlap with the summary's.
+            if st.session_state.key_points_future is None:
+                st.session_state.key_points_future = prefetch_key_points(st.session_state.processed_chunks)
+
             with st.spinner("Analyzing document and generating summary..."):
                 try:
                     summary, telugu_summary, audio = summarize_doc(st.session_state.processed_chunks)
@@ -156,15 +214,14 @@ if uploaded_file is not None:
                         st.markdown("**Telugu Summary**")
                         st.write(telugu_summary)
                         if audio:
-                            st.audio(audio)
+                            st.audio(audio, format="audio/mp3")
                             # Add download button for audio
-                            with open(audio, "rb") as f:
-                                st.download_button(
-                                    label="Download Telugu Audio",
-                                    data=f,
-                                    file_name="telugu_summary.mp3",
-                                    mime="audio/mpeg"
-                                )
+                            st.download_button(
+                                label="Download Telugu Audio",
+                                data=audio,
+                                file_name="telugu_summary.mp3",
+                                mime="audio/mpeg"
+                            )
                 except Exception as e:
                     st.error(f"Error generating summary: {e}")
         else:
@@ -176,7 +233,13 @@ if uploaded_file is not None:
         if st.session_state.processed_chunks:
             with st.spinner("Extracting key points..."):
                 try:
-                    points, telugu_points, audio = extract_key_points(st.session_state.processed_chunks)
+                    # Use the prefetched result once; later clicks run afresh.
+                    future = st.session_state.key_points_future
+                    st.session_state.key_points_future = None
+                    if future is not None:
+                        points, telugu_points, audio = future.result()
+                    else:
+                        points, telugu_points, audio = extract_key_points(st.session_state.processed_chunks)
 
                     col1, col2 = st.columns(2)
                     with col1:
@@ -187,15 +250,14 @@ if uploaded_file is not None:
                         st.markdown("**Key Points (Telugu)**")
                         st.write(telugu_points)
                         if audio:
-                            st.audio(audio)
+                            st.audio(audio, format="audio/mp3")
                             # Add download button for audio
-                            with open(audio, "rb") as f:
-                                st.download_button(
-                                    label="Download Telugu Audio",
-                                    data=f,
-                                    file_name="telugu_keypoints.mp3",
-                                    mime="audio/mpeg"
-                                )
+                            st.download_button(
+                                label="Download Telugu Audio",
+                                data=audio,
+                                file_name="telugu_keypoints.mp3",
+                                mime="audio/mpeg"
+                            )
                 except Exception as e:
                     st.error(f"Error extracting key points: {e}")
         else:
@@ -213,7 +275,11 @@ if uploaded_file is not None:
         if st.session_state.processed_chunks:
             with st.spinner("Searching the document and generating answer..."):
                 try:
-                    answer = answer_question(question, st.session_state.processed_chunks)
+                    answer = answer_question(
+                        question,
+                        st.session_state.processed_chunks,
+                        st.session_state.chunk_index
+                    )
                     st.session_state.chat_history.append(("You", question))
                     st.session_state.chat_history.append(("AI", answer))
                 except Exception as e:
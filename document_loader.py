@@ -1,17 +1,87 @@
-import PyPDF2
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
-def load_document(path):
-    if path.endswith(".txt"):
-        with open(path, "r", encoding="utf-8") as f:
+import pypdfium2 as pdfium
+
+# Each worker process gets at least this many pages; below that, process
+# startup costs more than it saves.
+PARALLEL_MIN_PAGES = 32
+
+def _extract_pages(pdf, start, stop):
+    texts = []
+    for index in range(start, stop):
+        page = pdf[index]
+        textpage = page.get_textpage()
+        texts.append(textpage.get_text_range())
+        textpage.close()
+        page.close()
+    return "".join(texts)
+
+def _extract_range(source, start, stop):
+    # Each worker opens its own handle; PDFium documents can't cross processes.
+    pdf = pdfium.PdfDocument(source)
+    try:
+        return start, _extract_pages(pdf, start, stop)
+    finally:
+        pdf.close()
+
+def _load_pdf(source):
+    pdf = pdfium.PdfDocument(source)
+    try:
+        n_pages = len(pdf)
+        workers = min(os.cpu_count() or 1, n_pages // PARALLEL_MIN_PAGES)
+        if workers < 2:
+            return _extract_pages(pdf, 0, n_pages)
+    finally:
+        pdf.close()
+
+    if not hasattr(source, "read"):
+        # PDFium reads paths on demand itself, so nothing is copied up front.
+        return _extract_parallel(source, n_pages, workers)
+
+    # Streams can't be shared with worker processes. Spill the stream to one
+    # temporary file for all workers to open, rather than pickling a full copy
+    # of its bytes into every worker.
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp:
+            source.seek(0)
+            shutil.copyfileobj(source, tmp, length=1 << 20)
+        return _extract_parallel(tmp.name, n_pages, workers)
+    finally:
+        os.remove(tmp.name)
+
+def _extract_parallel(path, n_pages, workers):
+    step = -(-n_pages // workers)  # ceiling division
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_extract_range, path, start, min(start + step, n_pages))
+            for start in range(0, n_pages, step)
+        ]
+        parts = sorted(future.result() for future in futures)
+    return "".join(text for _, text in parts)
+
+def load_document(path_or_stream, name=None):
+    """
+    Extracts the text of a PDF or TXT document.
+
+    path_or_stream is a file path or a binary file-like object. The format is
+    taken from name, which defaults to the path or the stream's name attribute.
+    """
+    if name is None:
+        name = getattr(path_or_stream, "name", path_or_stream)
+    is_stream = hasattr(path_or_stream, "read")
+
+    if name.endswith(".txt"):
+        if is_stream:
+            return path_or_stream.read().decode("utf-8")
+        with open(path_or_stream, "r", encoding="utf-8") as f:
             return f.read()
 
-    elif path.endswith(".pdf"):
-        text = ""
-        with open(path, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text()
-        return text
+    elif name.endswith(".pdf"):
+        return _load_pdf(path_or_stream)
 
     else:
         return "Unsupported file format"
@@ -1,4 +1,4 @@
 import openai
-import PyPDF2
+import pypdfium2
 import numpy
 print("All libraries working!")
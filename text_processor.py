@@ -1,3 +1,7 @@
+import re
+
+_TOKEN_RE = re.compile(r"\w+")
+
 def clean_text(text):
     return " ".join(text.split())
 
@@ -8,3 +12,50 @@ def split_into_chunks(text, chunk_size=500):
         chunk = " ".join(words[i:i+chunk_size])
         chunks.append(chunk)
     return chunks
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+def build_chunk_index(chunks):
+    """
+    Builds a lookup structure over the chunks for answering questions.
+
+    Returns a dict with "tokens", an inverted index mapping each lowercased
+    token to the set of chunk ids containing it, "chunks_lower", the
+    lowercased chunks, "vectorizer"/"tfidf", a fitted TfidfVectorizer and
+    the chunk matrix it produced (both None if the chunks have no terms), and
+    per chunk "sentences", its stripped sentences, and "sentence_lookup", a
+    dict from each token to the first sentence containing it.
+    """
+    tokens = {}
+    sentences = []
+    sentence_lookup = []
+    for i, chunk in enumerate(chunks):
+        for token in set(tokenize(chunk)):
+            tokens.setdefault(token, set()).add(i)
+
+        chunk_sentences = [s.strip() for s in chunk.split(".")]
+        first_sentence = {}
+        for j, sentence in enumerate(chunk_sentences):
+            for token in tokenize(sentence):
+                first_sentence.setdefault(token, j)
+        sentences.append(chunk_sentences)
+        sentence_lookup.append(first_sentence)
+
+    # Imported here so modules that only need tokenize don't load scikit-learn.
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer()
+    try:
+        tfidf = vectorizer.fit_transform(chunks)
+    except ValueError:  # empty vocabulary
+        vectorizer, tfidf = None, None
+
+    return {
+        "tokens": tokens,
+        "chunks_lower": [chunk.lower() for chunk in chunks],
+        "vectorizer": vectorizer,
+        "tfidf": tfidf,
+        "sentences": sentences,
+        "sentence_lookup": sentence_lookup,
+    }